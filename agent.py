@@ -4,6 +4,13 @@ LiveKit Voice Agent for Animal Control Services
 Integrates with existing LLMAnimalControlAgent for conversation logic
 """
 
+import asyncio
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 from dotenv import load_dotenv
 from livekit import agents
 from livekit.agents import AgentSession, Agent, RoomInputOptions
@@ -16,31 +23,117 @@ from livekit.plugins import (
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 # Import our existing animal control agent
-from src.agents.llm_animal_control_agent import LLMAnimalControlAgent
+from src.agents.llm_animal_control_agent import LLMAnimalControlAgent, GREETING
+from src.agents.llm_service import get_llm_service
+from src.config import LLM_CONFIG
 
 # Load environment variables from .env.local (LiveKit standard) or .env
 load_dotenv(".env.local")
 load_dotenv(".env")
 
+# Seconds to wait for the state machine before speaking a short filler,
+# so slow LLM turns don't leave the caller in dead air
+FILLER_DELAY = 1.5
+FILLER_MESSAGE = "One moment. "
+
+# Overall limit for a single state machine turn. Every LLM call in the turn
+# (a turn can make two, e.g. a transition plus state entry) shares a deadline
+# TURN_DEADLINE_MARGIN earlier, so the state machine can still return its own
+# fallback reply and free the executor before llm_node gives up
+TURN_TIMEOUT = 30.0
+TURN_DEADLINE_MARGIN = 1.0
+
+# Process init limit covering prewarm: the connection test uses the fallback
+# model itself (so no fallback call), i.e. (retry_attempts + 1) attempts of
+# `timeout` seconds, plus headroom for SDK backoff and loading the VAD model
+PREWARM_TIMEOUT = LLM_CONFIG['timeout'] * (LLM_CONFIG['retry_attempts'] + 1) + 10.0
+
+# Fixed replies for failed turns
+TIMEOUT_MESSAGE = "I'm sorry, that's taking longer than expected. Could you please repeat that?"
+ERROR_MESSAGE = "I apologize, but I encountered an error. Could you please try again?"
+# Final reply when the state machine agent can't be built; the call ends after it
+UNAVAILABLE_MESSAGE = "I'm sorry, our system is unavailable right now. Please call back later. Goodbye."
+
+
+def start_animal_control_agent() -> LLMAnimalControlAgent:
+    """Create our animal control agent and start its conversation (blocking)"""
+    animal_control_agent = LLMAnimalControlAgent()
+    animal_control_agent.start_conversation()
+    return animal_control_agent
+
 
 class AnimalControlVoiceAssistant(Agent):
     """Voice assistant that wraps our existing Animal Control Agent"""
     
-    def __init__(self) -> None:
-        # Initialize the existing animal control agent
-        self.animal_control_agent = LLMAnimalControlAgent()
+    def __init__(self, agent_ready: "asyncio.Future[LLMAnimalControlAgent]") -> None:
+        # The existing animal control agent is built in the background;
+        # llm_node waits for it on the first turn
+        self._agent_ready = agent_ready
         
-        # Get the initial greeting from our agent
-        initial_greeting = self.animal_control_agent.start_conversation()
+        # Dedicated worker for state machine turns so blocking LLM calls never
+        # compete with LiveKit's default executor, and turns run in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-machine")
+        
+        # Inputs not yet handed to the state machine, and the number of the
+        # newest turn; a turn superseded before it starts leaves its input
+        # here for the next one (guarded by _turn_lock across threads)
+        self._pending_inputs = []
+        self._turn_number = 0
+        self._turn_lock = threading.Lock()
         
         # Initialize the LiveKit Agent with a placeholder LLM
         # We override llm_node to use our state machine instead
+        # The greeting is static, so it doesn't need to wait for the agent
         super().__init__(
-            instructions=initial_greeting,
+            instructions=GREETING,
             # We need to provide an LLM for LiveKit to call llm_node
             # But we'll override it with our state machine
         )
     
+    def shutdown_executor(self) -> None:
+        """Drop queued turns and stop the state machine worker"""
+        # A turn already running can't be interrupted; it is bounded by the
+        # LLM timeout budget (see LLM_CONFIG) before the worker exits
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _process_turn(
+        self, 
+        animal_control_agent: LLMAnimalControlAgent, 
+        turn_number: int, 
+        deadline: float
+    ) -> Optional[str]:
+        """Run a turn on the executor, merging in inputs from superseded turns"""
+        with self._turn_lock:
+            if turn_number != self._turn_number:
+                # The caller spoke again before this turn started (LiveKit
+                # interrupted it); skip the LLM call and let the newer turn
+                # handle this input together with its own
+                return None
+            user_input = " ".join(self._pending_inputs)
+            self._pending_inputs.clear()
+        
+        if not user_input:
+            return None
+        return animal_control_agent.process_message(user_input, deadline=deadline)
+    
+    async def _run_turn(self, turn_number: int, deadline: float) -> Optional[str]:
+        """Wait for the agent to be built, then run one state machine turn"""
+        try:
+            # Shield so a cancelled turn doesn't cancel agent construction
+            animal_control_agent = await asyncio.shield(self._agent_ready)
+        except Exception:
+            # The entrypoint reports a failed build and ends the call
+            return None
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, 
+            self._process_turn, 
+            animal_control_agent, 
+            turn_number, 
+            deadline
+        )
+    
     async def llm_node(
         self,
         chat_ctx,  # llm.ChatContext
@@ -59,9 +152,7 @@ class AnimalControlVoiceAssistant(Agent):
         Yields:
             str: Response text from our state machine
         """
-        import asyncio
-        import traceback
-        
+        turn = None
         try:
             # Get the last user message from the chat context
             # ChatContext uses 'items' not 'messages'
@@ -80,16 +171,24 @@ class AnimalControlVoiceAssistant(Agent):
             
             print(f"🎤 User said: {user_input}")
             
-            # Process through our state machine with timeout
-            loop = asyncio.get_event_loop()
-            response = await asyncio.wait_for(
-                loop.run_in_executor(
-                    None, 
-                    self.animal_control_agent.process_message, 
-                    user_input
-                ),
-                timeout=30.0  # 30 second timeout
-            )
+            # Process through our state machine with timeout; the first turn
+            # also waits here for the agent build, inside the same budget
+            with self._turn_lock:
+                self._pending_inputs.append(user_input)
+                self._turn_number += 1
+                turn_number = self._turn_number
+            deadline = time.monotonic() + TURN_TIMEOUT - TURN_DEADLINE_MARGIN
+            turn = asyncio.create_task(self._run_turn(turn_number, deadline))
+            
+            # Speak a filler if the answer isn't ready quickly; TTS starts on
+            # the first yielded chunk while the state machine keeps working
+            done, _ = await asyncio.wait({turn}, timeout=FILLER_DELAY)
+            if not done:
+                yield FILLER_MESSAGE
+            
+            response = await asyncio.wait_for(turn, timeout=TURN_TIMEOUT - FILLER_DELAY)
+            if response is None:
+                return
             
             print(f"🤖 Agent responding: {response[:100]}...")
             
@@ -98,11 +197,29 @@ class AnimalControlVoiceAssistant(Agent):
             
         except asyncio.TimeoutError:
             print(f"⏱️ Timeout processing message: {user_input}")
-            yield "I'm sorry, that's taking longer than expected. Could you please repeat that?"
+            yield TIMEOUT_MESSAGE
         except Exception as e:
             print(f"❌ Error in llm_node: {e}")
             traceback.print_exc()
-            yield "I apologize, but I encountered an error. Could you please try again?"
+            yield ERROR_MESSAGE
+        finally:
+            # If LiveKit interrupted this turn, don't leave the task running unobserved
+            if turn is not None and not turn.done():
+                turn.cancel()
+
+
+def prewarm(proc: agents.JobProcess):
+    """Load the VAD model and verify the LLM connection before any call is assigned"""
+    proc.userdata["vad"] = silero.VAD.load()
+    
+    # Each job process serves a single call, so the test completion runs here
+    # while the process sits idle instead of while the caller is connecting.
+    # The agent constructor reuses the cached result, or retries on failure
+    try:
+        if not get_llm_service().ensure_connection():
+            print("⚠️  Warning: LLM connection check failed during prewarm")
+    except Exception as e:
+        print(f"⚠️  Warning: LLM initialization failed during prewarm: {e}")
 
 
 async def entrypoint(ctx: agents.JobContext):
@@ -117,7 +234,7 @@ async def entrypoint(ctx: agents.JobContext):
     session = AgentSession(
         stt=deepgram.STT(
             model="nova-3",
-            language="multi"  # Supports multiple languages
+            language="en"  # All prompts are English; skip multilingual detection
         ),
         llm=openai.LLM(model="gpt-4o-mini"),  # Placeholder - overridden by llm_node
         tts=openai.TTS(
@@ -125,12 +242,31 @@ async def entrypoint(ctx: agents.JobContext):
             voice="nova",      # Female, energetic voice
             speed=1.15         # 15% faster (range: 0.25 to 4.0)
         ),
-        vad=silero.VAD.load(),  # Voice Activity Detection
+        vad=ctx.proc.userdata["vad"],  # Voice Activity Detection (loaded in prewarm)
         turn_detection=MultilingualModel(),  # Detect when user finishes speaking
     )
 
+    # Build our state machine agent in a background thread; construction
+    # blocks on network I/O, so connect and greet the caller meanwhile
+    agent_ready = asyncio.create_task(asyncio.to_thread(start_animal_control_agent))
+    await ctx.connect()
+    
     # Create our agent instance
-    agent = AnimalControlVoiceAssistant()
+    agent = AnimalControlVoiceAssistant(agent_ready)
+    
+    async def on_shutdown():
+        """Release per-call resources when the job ends"""
+        # The executor's non-daemon worker would otherwise hold process exit open
+        agent.shutdown_executor()
+        
+        # Flush queued Supabase writes (e.g. end_call) before the daemon
+        # logger thread is killed with the job process
+        if agent_ready.done() and not agent_ready.cancelled() and agent_ready.exception() is None:
+            call_logger = agent_ready.result().call_logger
+            if call_logger:
+                await asyncio.to_thread(call_logger.shutdown)
+    
+    ctx.add_shutdown_callback(on_shutdown)
     
     # Start the session
     await session.start(
@@ -142,11 +278,26 @@ async def entrypoint(ctx: agents.JobContext):
         ),
     )
 
-    # Speak the initial greeting from our state machine
-    # (The greeting was already generated when we initialized the agent)
-    session.say(agent.instructions)
+    # Speak the initial greeting right away
+    # (The greeting is static, so it never waits on the state machine)
+    session.say(GREETING)
+    
+    # If the agent can't be built, say so once and end the call instead of
+    # asking the caller to retry on every turn
+    try:
+        await agent_ready
+    except Exception as e:
+        print(f"❌ Failed to start animal control agent: {e}")
+        traceback.print_exc()
+        await session.say(UNAVAILABLE_MESSAGE, allow_interruptions=False).wait_for_playout()
+        ctx.shutdown(reason="animal control agent failed to start")
 
 
 if __name__ == "__main__":
     # Run the agent with LiveKit CLI
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+    agents.cli.run_app(agents.WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        # Prewarm includes the LLM connection test
+        initialize_process_timeout=PREWARM_TIMEOUT,
+    ))
@@ -14,6 +14,9 @@ from src.state_machine.animal_control_states import (
 from .llm_service import get_llm_service
 from src.logging import CallLogger
 
+# Static opening line; returned for every new call without an LLM round-trip
+GREETING = "Hello! I'm here to help with animal control services. How can I assist you today?"
+
 class LLMAnimalControlAgent:
     """LLM-enhanced animal control agent orchestrator"""
     
@@ -39,9 +42,9 @@ class LLMAnimalControlAgent:
         self.is_initialized = False
         self.llm_enabled = True
         
-        # Test LLM connection
+        # Test LLM connection (normally already verified in the worker's prewarm)
         try:
-            if not get_llm_service().test_connection():
+            if not get_llm_service().ensure_connection():
                 print("⚠️  Warning: LLM connection failed")
                 raise RuntimeError("LLM connection failed")
         except Exception as e:
@@ -88,21 +91,19 @@ class LLMAnimalControlAgent:
         # Reset context for new conversation
         self.state_machine.context.clear()
         
-        # Create a concise greeting message
-        greeting = "Hello! I'm here to help with animal control services. How can I assist you today?"
-        
         # Start state machine with session ID for logging
         self.state_machine.start_conversation(session_id=self.session_id)
         
         # Return the standardized greeting
-        return greeting
+        return GREETING
     
-    def process_message(self, user_input: str) -> str:
+    def process_message(self, user_input: str, deadline: Optional[float] = None) -> str:
         """
         Process a user message and return the agent's response
         
         Args:
             user_input: The user's input message
+            deadline: Optional time.monotonic() deadline for every LLM call in this turn
             
         Returns:
             The agent's response message
@@ -110,6 +111,11 @@ class LLMAnimalControlAgent:
         if not self.session_id:
             raise RuntimeError("Conversation not started. Call start_conversation() first.")
         
+        with get_llm_service().turn_deadline(deadline):
+            return self._process_message(user_input)
+    
+    def _process_message(self, user_input: str) -> str:
+        """Run one state machine turn, recovering through ERROR_HANDLING on failure"""
         try:           
             
             # Process directly through state machine
@@ -152,7 +158,8 @@ class LLMAnimalControlAgent:
     
     def get_case_summary(self) -> Optional[Dict[str, Any]]:
         """Get summary of the current case being processed"""
-        context = self.state_machine.get_context()
+        # Read-only access, so use the live context rather than a copy
+        context = self.state_machine.context
         
         if 'case_id' not in context:
             return None
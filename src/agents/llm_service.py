@@ -1,7 +1,11 @@
 import os
 import json
+import threading
+import time
+from contextlib import contextmanager
 from typing import Dict, Any, List, Optional, Union
 from dataclasses import dataclass
+import httpx
 import openai
 from dotenv import load_dotenv
 from src.config import LLM_CONFIG
@@ -9,6 +13,12 @@ from src.config import LLM_CONFIG
 # Load environment variables
 load_dotenv()
 
+# OpenRouter attribution headers sent with every request
+OPENROUTER_HEADERS = {
+    "HTTP-Referer": "https://github.com/your-repo/HealthAgent",
+    "X-Title": "HealthAgent"
+}
+
 @dataclass
 class ToolCall:
     """Represents a tool call from the LLM"""
@@ -33,23 +43,37 @@ class OpenRouterService:
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable is required")
         
+        self.default_model = LLM_CONFIG['model']
+        self.temperature = LLM_CONFIG['temperature']
+        self.max_tokens = LLM_CONFIG['max_tokens']
+        self.timeout = LLM_CONFIG['timeout']
+        self.retry_attempts = LLM_CONFIG['retry_attempts']
+        self._connection_verified = False
+        self._turn = threading.local()  # Per-thread turn deadline (see turn_deadline)
+        
         # Initialize OpenAI client with OpenRouter configuration
         try:
             # Initialize OpenAI client for OpenRouter - minimal config to avoid compatibility issues
+            # Keep pooled connections alive between turns so each LLM call
+            # reuses the TLS session instead of handshaking again
             self.client = openai.OpenAI(
                 base_url=LLM_CONFIG['api_base_url'],
-                api_key=self.api_key
+                api_key=self.api_key,
+                # The SDK retries 429/5xx with exponential backoff; bound each attempt
+                timeout=self.timeout,
+                max_retries=self.retry_attempts,
+                http_client=openai.DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=32,
+                        max_keepalive_connections=16,
+                        keepalive_expiry=LLM_CONFIG['keepalive_expiry']
+                    )
+                )
             )
             print("✅ OpenRouter client initialized successfully!")
         except Exception as e:
             print(f"❌ Failed to initialize OpenAI client: {e}")
             self.client = None
-        
-        self.default_model = LLM_CONFIG['model']
-        self.temperature = LLM_CONFIG['temperature']
-        self.max_tokens = LLM_CONFIG['max_tokens']
-        self.timeout = LLM_CONFIG['timeout']
-        self.retry_attempts = LLM_CONFIG['retry_attempts']
     
     def _test_connection(self):
         """Test the OpenRouter connection with a simple request"""
@@ -68,6 +92,21 @@ class OpenRouterService:
             print(f"Connection test failed: {e}")
             return False
 
+    @contextmanager
+    def turn_deadline(self, deadline: Optional[float]):
+        """Bound every chat completion made by this thread to a time.monotonic() deadline"""
+        previous = getattr(self._turn, 'deadline', None)
+        self._turn.deadline = deadline
+        try:
+            yield
+        finally:
+            self._turn.deadline = previous
+    
+    def _remaining_budget(self) -> Optional[float]:
+        """Seconds left before this thread's turn deadline, or None if unbounded"""
+        deadline = getattr(self._turn, 'deadline', None)
+        return None if deadline is None else deadline - time.monotonic()
+    
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -114,16 +153,19 @@ class OpenRouterService:
         if not self.client:
             raise Exception("OpenRouter client not initialized")
         
+        # Within a turn, cap this attempt at the time left and skip SDK retries;
+        # the deadline (not the retry count) decides whether another call is made
+        client = self.client
+        remaining = self._remaining_budget()
+        if remaining is not None:
+            if remaining < LLM_CONFIG['min_attempt_seconds']:
+                raise Exception("OpenRouter API error: turn deadline exceeded")
+            client = self.client.with_options(timeout=min(self.timeout, remaining), max_retries=0)
+        
         try:
-            # Add OpenRouter headers to the request
-            extra_headers = {
-                "HTTP-Referer": "https://github.com/your-repo/HealthAgent",
-                "X-Title": "HealthAgent"
-            }
-            
             # Make the API call with OpenRouter headers
-            response = self.client.chat.completions.create(
-                extra_headers=extra_headers,
+            response = client.chat.completions.create(
+                extra_headers=OPENROUTER_HEADERS,
                 **request_params
             )
             
@@ -150,8 +192,10 @@ class OpenRouterService:
             )
             
         except Exception as e:
-            # Try fallback model if available
-            if model != LLM_CONFIG['fallback_model']:
+            # Try fallback model if available and the turn has time left for it
+            remaining = self._remaining_budget()
+            has_budget = remaining is None or remaining >= LLM_CONFIG['min_attempt_seconds']
+            if model != LLM_CONFIG['fallback_model'] and has_budget:
                 return self.chat_completion(
                     messages=messages,
                     tools=tools,
@@ -181,10 +225,35 @@ class OpenRouterService:
         except Exception as e:
             print(f"Connection test failed: {e}")
             return False
+    
+    def ensure_connection(self) -> bool:
+        """Test the connection once per process and remember a successful result
+        
+        Called from the LiveKit prewarm hook, so the check runs before a call
+        is assigned to the job process.
+        """
+        if not self._connection_verified:
+            self._connection_verified = self.test_connection()
+        return self._connection_verified
 
 class LLMToolManager:
     """Manages tool definitions for LLM function calling"""
     
+    # Relevant tools for each state (built once, not per LLM call)
+    STATE_TOOL_MAPPING = {
+        # Animal control agent states
+        "GREETING": ["analyze_request", "update_context", "generate_response"],
+        "EMERGENCY_CASE": ["analyze_request", "update_context", "generate_response"],
+        "REPORT_FOUND": ["analyze_request", "update_context", "generate_response"],
+        "REPORT_LOST": ["analyze_request", "update_context", "generate_response"],
+        "PET_SURRENDER": ["analyze_request", "update_context", "generate_response"],
+        "SCHEDULE_SURRENDER": ["parse_datetime_request", "update_context", "generate_response"],
+        "GENERAL_INFO": ["analyze_request", "update_context", "generate_response"],
+        "CASE_CONFIRMATION": ["update_context", "generate_response"],
+        "CASE_COMPLETE": ["update_context", "generate_response"],
+        "ERROR_HANDLING": ["update_context", "generate_response"]
+    }
+    
     def __init__(self):
         self.tools = {}
         self._register_default_tools()
@@ -341,22 +410,8 @@ class LLMToolManager:
     
     def get_tools_for_state(self, state_name: str) -> List[Dict]:
         """Get relevant tools for a specific state"""
-        state_tool_mapping = {
-            # Animal control agent states
-            "GREETING": ["analyze_request", "update_context", "generate_response"],
-            "EMERGENCY_CASE": ["analyze_request", "update_context", "generate_response"],
-            "REPORT_FOUND": ["analyze_request", "update_context", "generate_response"],
-            "REPORT_LOST": ["analyze_request", "update_context", "generate_response"],
-            "PET_SURRENDER": ["analyze_request", "update_context", "generate_response"],
-            "SCHEDULE_SURRENDER": ["parse_datetime_request", "update_context", "generate_response"],
-            "GENERAL_INFO": ["analyze_request", "update_context", "generate_response"],
-            "CASE_CONFIRMATION": ["update_context", "generate_response"],
-            "CASE_COMPLETE": ["update_context", "generate_response"],
-            "ERROR_HANDLING": ["update_context", "generate_response"]
-        }
-        
         # Always include update_context and generate_response as fallbacks
-        tool_names = state_tool_mapping.get(state_name, ["update_context", "generate_response"])
+        tool_names = self.STATE_TOOL_MAPPING.get(state_name, ["update_context", "generate_response"])
         return [self.tools[name] for name in tool_names if name in self.tools]
 
 # Global instances
@@ -35,8 +35,14 @@ LLM_CONFIG = {
     'model': 'anthropic/claude-3-haiku',  # Fast model for real-time conversations
     'temperature': 0.7,
     'max_tokens': 1000,
-    'timeout': 30,
-    'retry_attempts': 3,
+    # Per-attempt seconds; requests aren't streamed, so this covers the whole
+    # generation (long confirmation/summary turns on the conversation model)
+    'timeout': 20,
+    'keepalive_expiry': 60,  # Seconds to keep idle connections; must outlast a caller's turn
+    # SDK retries outside a voice turn (e.g. the connection test). Within a
+    # turn, the turn deadline decides whether another attempt is made
+    'retry_attempts': 1,
+    'min_attempt_seconds': 3,  # Don't start (or fall back to) a call with less turn budget left
     'use_tools': True,
     'fallback_model': 'openai/gpt-3.5-turbo',
 }
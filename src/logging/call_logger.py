@@ -13,6 +13,21 @@ import json
 import threading
 from queue import Queue
 
+from src.config import DEBUG_MODE
+
+# Fields left out of logged context: UI state, temporary messages, internal tracking
+EXCLUDED_LOG_KEYS = frozenset({
+    'conversation_history',
+    'last_llm_response',
+    'last_response',
+    'message',
+    'turn_count',
+    'conversation_started',
+    'last_user_input',
+    'error_message',
+    'completion_message'
+})
+
 
 class CallLogger:
     """Logs call data and state transitions to Supabase"""
@@ -47,14 +62,12 @@ class CallLogger:
     
     def _log_worker(self):
         """Background worker that processes log queue"""
-        from queue import Empty
-        
-        while not self._shutdown:
+        while True:
             try:
-                # Get log task from queue (blocks until available)
-                task = self._log_queue.get(timeout=1)
+                # Get log task from queue (sleeps until available, no polling)
+                task = self._log_queue.get()
                 
-                if task is None:  # Shutdown signal
+                if task is None:  # Shutdown signal, queued after any pending tasks
                     break
                 
                 # Execute the logging task
@@ -67,9 +80,6 @@ class CallLogger:
                 elif task_type == 'end_call':
                     self._execute_end_call(data)
                 
-            except Empty:
-                # Timeout waiting for task - this is normal, just continue
-                continue
             except Exception as e:
                 # Don't let worker thread die on errors
                 if not self._shutdown:
@@ -77,6 +87,12 @@ class CallLogger:
                     print(f"⚠️ LOGGER: Background worker error - {str(e)}")
                     print(f"⚠️ LOGGER: {traceback.format_exc()}")
     
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the background worker after it drains queued tasks (called at job shutdown)"""
+        self._shutdown = True
+        self._log_queue.put(None)  # Wake the worker if it is waiting
+        self._worker_thread.join(timeout=timeout)
+    
     def start_call(self, session_id: str, initial_state: str, user_phone: str = None) -> uuid.UUID:
         """
         Start tracking a new call
@@ -153,11 +169,8 @@ class CallLogger:
         if llm_tokens:
             self.llm_call_count += 1
         
-        # Clean context for JSON serialization
-        clean_context = self._clean_for_json(context)
-        clean_updates = self._clean_for_json(context_updates)
-        
         # Queue the logging task (non-blocking)
+        # Snapshots are cleaned for JSON in the background worker
         data = {
             'call_id': str(self.current_call_id),
             'timestamp': datetime.now().isoformat(),
@@ -167,20 +180,26 @@ class CallLogger:
             'transition_type': transition_type,
             'user_input': user_input,
             'agent_response': agent_response,
-            'context_snapshot': clean_context,
-            'context_updates': clean_updates,
+            'context_snapshot': dict(context) if context is not None else None,
+            'context_updates': dict(context_updates) if context_updates is not None else None,
             'llm_model': llm_model,
             'llm_tokens_used': llm_tokens,
             'processing_time_ms': processing_time_ms
         }
         self._log_queue.put(('log_transition', data))
-        print(f"📊 LOGGER: Queued transition {from_state} → {to_state} (seq: {self.sequence_number})")
+        if DEBUG_MODE:
+            print(f"📊 LOGGER: Queued transition {from_state} → {to_state} (seq: {self.sequence_number})")
     
     def _execute_log_transition(self, data: Dict[str, Any]):
         """Execute log_transition in background thread"""
         try:
+            # Clean context for JSON serialization off the conversation thread
+            data['context_snapshot'] = self._clean_for_json(data['context_snapshot'])
+            data['context_updates'] = self._clean_for_json(data['context_updates'])
+            
             result = self.supabase.table('state_transitions').insert(data).execute()
-            print(f"✅ LOGGER: Logged transition {data['from_state']} → {data['to_state']}")
+            if DEBUG_MODE:
+                print(f"✅ LOGGER: Logged transition {data['from_state']} → {data['to_state']}")
         except Exception as e:
             print(f"❌ LOGGER ERROR: Failed to log transition - {str(e)}")
     
@@ -235,29 +254,21 @@ class CallLogger:
         
         if isinstance(data, dict):
             # Only include fields relevant for reporting
-            # Exclude: UI state, temporary messages, internal tracking
-            exclude_keys = [
-                'conversation_history',
-                'last_llm_response',
-                'last_response',
-                'message',
-                'turn_count',
-                'conversation_started',
-                'last_user_input',
-                'error_message',
-                'completion_message'
-            ]
+            cleaned = {key: value for key, value in data.items() if key not in EXCLUDED_LOG_KEYS}
+            try:
+                # Test the whole snapshot in one pass (the common case)
+                json.dumps(cleaned)
+                return cleaned
+            except (TypeError, ValueError):
+                pass
             
-            cleaned = {}
-            for key, value in data.items():
-                if key not in exclude_keys:
-                    try:
-                        # Test if serializable
-                        json.dumps(value)
-                        cleaned[key] = value
-                    except (TypeError, ValueError):
-                        # Skip non-serializable values
-                        cleaned[key] = str(value)[:100]  # Truncate to 100 chars
+            # Fall back to checking each value individually
+            for key, value in cleaned.items():
+                try:
+                    json.dumps(value)
+                except (TypeError, ValueError):
+                    # Replace non-serializable values
+                    cleaned[key] = str(value)[:100]  # Truncate to 100 chars
             return cleaned
         
         return data
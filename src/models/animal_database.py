@@ -9,6 +9,8 @@ class MockAnimalDatabase:
     
     def __init__(self):
         self.cases: Dict[str, Case] = {}
+        # Secondary index by case type so matching doesn't scan every case
+        self._cases_by_type: Dict[CaseType, List[Case]] = {case_type: [] for case_type in CaseType}
         self._populate_sample_data()
     
     def _populate_sample_data(self):
@@ -65,7 +67,12 @@ class MockAnimalDatabase:
         ]
         
         for case in sample_cases:
-            self.cases[case.id] = case
+            self._add_case(case)
+    
+    def _add_case(self, case: Case) -> None:
+        """Store a case and index it by type"""
+        self.cases[case.id] = case
+        self._cases_by_type[case.case_type].append(case)
     
     # Case operations
     def get_case(self, case_id: str) -> Optional[Case]:
@@ -74,8 +81,7 @@ class MockAnimalDatabase:
     
     def get_cases_by_type(self, case_type: CaseType) -> List[Case]:
         """Get all cases of a specific type"""
-        return [case for case in self.cases.values() 
-                if case.case_type == case_type]
+        return list(self._cases_by_type.get(case_type, []))
     
     def get_cases_by_status(self, status: CaseStatus) -> List[Case]:
         """Get all cases with a specific status"""
@@ -101,7 +107,7 @@ class MockAnimalDatabase:
             description=description,
             details=details
         )
-        self.cases[case_id] = case
+        self._add_case(case)
         return case
     
     def update_case_status(self, case_id: str, status: CaseStatus) -> bool:
@@ -3,10 +3,93 @@ from typing import Dict, Any, Optional, Tuple, List
 from enum import Enum
 from datetime import datetime
 import json
+import traceback
 
 from src.agents.llm_service import get_llm_service, get_tool_manager
 from .context_fields import ContextField
-from src.config import AVAILABLE_MODELS
+from src.config import AVAILABLE_MODELS, DEBUG_MODE
+
+# Internal state machine keys that are never shown to the LLM
+INTERNAL_CONTEXT_KEYS = frozenset({'conversation_history', 'last_llm_response', 'message', 'error_message'})
+# Bulky keys left out of debug context dumps
+DEBUG_EXCLUDED_KEYS = frozenset({'conversation_history', 'last_llm_response'})
+
+# Field mappings - what other fields can satisfy a required field
+FIELD_MAPPINGS = {
+    ContextField.IDENTIFYING_FEATURES.value: (
+        'distinctive_features', 'has_collar', 'has_tags', 'has_microchip'
+    ),
+    ContextField.OWNER_CONTACT.value: (
+        # If both owner_name and owner_phone exist, owner_contact is satisfied
+        ('owner_name', 'owner_phone'),
+        'contact_info',
+        'phone_number',
+        'email'
+    ),
+    ContextField.ANIMAL_DESCRIPTION.value: (
+        'animal_color', 'breed', 'animal_size', 'animal_weight'
+    ),
+    ContextField.ANIMAL_CONDITION.value: (
+        'condition', 'health_status', 'severity'
+    )
+}
+
+# This maps state names to what they need/ask for first
+STATE_TRANSITION_INFO = {
+    "EMERGENCY_CASE": {
+        "description": "Handles injured, sick, or abused animal emergencies",
+        "first_asks": "the type of animal and its condition/emergency situation"
+    },
+    "REPORT_FOUND": {
+        "description": "Handles reports of found animals",
+        "first_asks": "what type of animal was found and where it was found"
+    },
+    "REPORT_LOST": {
+        "description": "Handles reports of lost pets",
+        "first_asks": "what type of animal is lost and where it was last seen"
+    },
+    "PET_SURRENDER": {
+        "description": "Handles pet surrender requests",
+        "first_asks": "what type of animal (if not already known) OR the reason for surrender (if type is known) - ONE question only"
+    },
+    "SCHEDULE_SURRENDER": {
+        "description": "Schedules appointment for pet surrender",
+        "first_asks": "when they would like to schedule the surrender appointment"
+    },
+    "CASE_CONFIRMATION": {
+        "description": "Confirms all collected information before finalizing",
+        "first_asks": "MUST provide a complete summary of all collected information (animal type, reason, contact, appointment time, etc.) and ask if everything is correct"
+    },
+    "FINAL_SUMMARY": {
+        "description": "Provides final summary and case number",
+        "first_asks": "nothing - provides summary and ends conversation"
+    }
+}
+
+
+def _build_state_transition_prompt() -> str:
+    """Build the static transition guidance appended to every state prompt"""
+    prompt = "\n\n===== STATE TRANSITION OPTIMIZATION =====\n"
+    prompt += "When transitioning to a new state, you MUST provide a response that does what that state needs.\n"
+    prompt += "This eliminates a second LLM call and makes the conversation faster.\n\n"
+    
+    prompt += "State Information (what to do when transitioning):\n"
+    for state_name, info in STATE_TRANSITION_INFO.items():
+        prompt += f"- {state_name}: {info['description']}\n"
+        prompt += f"  → Must do: {info['first_asks']}\n"
+    
+    prompt += "\nExamples:\n"
+    prompt += "- Transitioning to REPORT_LOST: Acknowledge what they said AND ask about the lost animal type/last seen location.\n"
+    prompt += "- Transitioning to CASE_CONFIRMATION: Provide a COMPLETE summary of all collected info AND ask if it's correct.\n"
+    prompt += "\nCRITICAL: For CASE_CONFIRMATION, you must actually provide the summary, not just say 'let me summarize'.\n"
+    prompt += "===== END STATE TRANSITION OPTIMIZATION =====\n"
+    return prompt
+
+
+# Identical for every state and turn, so build it once at import
+STATE_TRANSITION_PROMPT = _build_state_transition_prompt()
+
+
 class StateResult(Enum):
     """Possible results from state execution"""
     CONTINUE = "continue"  # Stay in current state
@@ -189,12 +272,9 @@ Remember to use the generate_response tool for your final response.
         Extract relevant context for prompt generation.
         Filters out internal state machine details.
         """
-        # Keys to exclude from context sent to LLM
-        exclude_keys = ['conversation_history', 'last_llm_response', 'message', 'error_message']
-        
         # Create a filtered context
         filtered_context = {k: v for k, v in context.items() 
-                           if k not in exclude_keys and not isinstance(v, (dict, list)) and v is not None}
+                           if k not in INTERNAL_CONTEXT_KEYS and not isinstance(v, (dict, list)) and v is not None}
         
         # Add information about missing fields if available
         if hasattr(self, 'required_fields'):
@@ -280,26 +360,6 @@ Remember to use the generate_response tool for your final response.
         if not hasattr(self, 'required_fields'):
             return []
             
-        # Define field mappings - what other fields can satisfy a required field
-        field_mappings = {
-            ContextField.IDENTIFYING_FEATURES.value: [
-                'distinctive_features', 'has_collar', 'has_tags', 'has_microchip'
-            ],
-            ContextField.OWNER_CONTACT.value: [
-                # If both owner_name and owner_phone exist, owner_contact is satisfied
-                ('owner_name', 'owner_phone'),
-                'contact_info',
-                'phone_number',
-                'email'
-            ],
-            ContextField.ANIMAL_DESCRIPTION.value: [
-                'animal_color', 'breed', 'animal_size', 'animal_weight'
-            ],
-            ContextField.ANIMAL_CONDITION.value: [
-                'condition', 'health_status', 'severity'
-            ]
-        }
-        
         missing = []
         
         # Check each required field with mapping for related fields
@@ -309,10 +369,10 @@ Remember to use the generate_response tool for your final response.
                 continue
                 
             # Check if any mapped fields exist that would satisfy this requirement
-            if field in field_mappings:
+            if field in FIELD_MAPPINGS:
                 # Check each possible mapping
                 field_satisfied = False
-                for mapping in field_mappings[field]:
+                for mapping in FIELD_MAPPINGS[field]:
                     # Handle tuple case (all fields in tuple must exist)
                     if isinstance(mapping, tuple):
                         if all(context.get(m) for m in mapping):
@@ -383,9 +443,13 @@ Remember to use the generate_response tool for your final response.
     
     def _debug_context(self, context: Dict[str, Any], label: str) -> None:
         """Print debug information about the current context"""
+        # Skip building the dump entirely unless debugging is enabled
+        if not DEBUG_MODE:
+            return
+        
         # Create a filtered version of context for debugging
         debug_context = {k: v for k, v in context.items() 
-                        if k not in ['conversation_history', 'last_llm_response'] 
+                        if k not in DEBUG_EXCLUDED_KEYS 
                         and not isinstance(v, (dict, list)) and v is not None}
         
         print(f"🔧 CONTEXT DEBUG [{label}] State: {self.name} - {json.dumps(debug_context, indent=2)}")
@@ -419,7 +483,7 @@ Remember to use the generate_response tool for your final response.
         # Add known information
         known_info = []
         for key, value in context.items():
-            if key not in ['conversation_history', 'last_llm_response', 'message', 'error_message'] \
+            if key not in INTERNAL_CONTEXT_KEYS \
                and not isinstance(value, (dict, list)) and value is not None:
                 known_info.append(f"- {key}: {value}")
         
@@ -436,60 +500,11 @@ Remember to use the generate_response tool for your final response.
                 
         prompt += "\n===== END CONTEXT INFORMATION =====\n"
         
-        # Add state transition information for optimization
-        prompt += "\n\n===== STATE TRANSITION OPTIMIZATION =====\n"
-        prompt += "When transitioning to a new state, you MUST provide a response that does what that state needs.\n"
-        prompt += "This eliminates a second LLM call and makes the conversation faster.\n\n"
-        
-        state_info = self._get_state_transition_info()
-        prompt += "State Information (what to do when transitioning):\n"
-        for state_name, info in state_info.items():
-            prompt += f"- {state_name}: {info['description']}\n"
-            prompt += f"  → Must do: {info['first_asks']}\n"
-        
-        prompt += "\nExamples:\n"
-        prompt += "- Transitioning to REPORT_LOST: Acknowledge what they said AND ask about the lost animal type/last seen location.\n"
-        prompt += "- Transitioning to CASE_CONFIRMATION: Provide a COMPLETE summary of all collected info AND ask if it's correct.\n"
-        prompt += "\nCRITICAL: For CASE_CONFIRMATION, you must actually provide the summary, not just say 'let me summarize'.\n"
-        prompt += "===== END STATE TRANSITION OPTIMIZATION =====\n"
+        # Add state transition information for optimization (precomputed once)
+        prompt += STATE_TRANSITION_PROMPT
         
         return prompt
     
-    def _get_state_transition_info(self) -> Dict[str, str]:
-        """Get information about what each state needs when transitioning to it"""
-        # This maps state names to what they need/ask for first
-        state_info = {
-            "EMERGENCY_CASE": {
-                "description": "Handles injured, sick, or abused animal emergencies",
-                "first_asks": "the type of animal and its condition/emergency situation"
-            },
-            "REPORT_FOUND": {
-                "description": "Handles reports of found animals",
-                "first_asks": "what type of animal was found and where it was found"
-            },
-            "REPORT_LOST": {
-                "description": "Handles reports of lost pets",
-                "first_asks": "what type of animal is lost and where it was last seen"
-            },
-            "PET_SURRENDER": {
-                "description": "Handles pet surrender requests",
-                "first_asks": "what type of animal (if not already known) OR the reason for surrender (if type is known) - ONE question only"
-            },
-            "SCHEDULE_SURRENDER": {
-                "description": "Schedules appointment for pet surrender",
-                "first_asks": "when they would like to schedule the surrender appointment"
-            },
-            "CASE_CONFIRMATION": {
-                "description": "Confirms all collected information before finalizing",
-                "first_asks": "MUST provide a complete summary of all collected information (animal type, reason, contact, appointment time, etc.) and ask if everything is correct"
-            },
-            "FINAL_SUMMARY": {
-                "description": "Provides final summary and case number",
-                "first_asks": "nothing - provides summary and ends conversation"
-            }
-        }
-        return state_info
-        
     def generate_progress_bar(self, context: Dict[str, Any]) -> str:
         """Generate a progress bar showing completion status"""
         if not hasattr(self, 'required_fields') or not self.required_fields:
@@ -544,9 +559,9 @@ Remember to use the generate_response tool for your final response.
                 tools=tools,
                 model=self.model
             )
-            print(f"Model used: {response.model}")
-            print(f"Tokens used: {response.usage.get('total_tokens')}")
-            print(f"Response time: {response.usage.get('total_tokens')}")
+            if DEBUG_MODE:
+                print(f"Model used: {response.model}")
+                print(f"Tokens used: {(response.usage or {}).get('total_tokens')}")
             
             # Process tool calls
             updated_context = context.copy()
@@ -557,7 +572,6 @@ Remember to use the generate_response tool for your final response.
             if response.tool_calls:
                 print(f"🔧 SYSTEM: LLM made {len(response.tool_calls)} tool call(s)")
                 for tool_call in response.tool_calls:
-                    print(f"🔧 SYSTEM: Tool called - '{tool_call.name}' with args: {tool_call.arguments}")
                     result = self._handle_tool_call(tool_call, context, user_input)
                     if result:
                         updated_context.update(result.get('context_updates', {}))
@@ -580,11 +594,15 @@ Remember to use the generate_response tool for your final response.
                 'timestamp': datetime.now().isoformat()
             }
             
+            # Strip each candidate response once and reuse the result below
+            has_final_response = bool(final_response and final_response.strip())
+            direct_content = response.content.strip() if response.content else ""
+            
             # For transitions, we SHOULD have a response message (optimized single-call approach)
             # The LLM should generate a response that asks for what the next state needs
             if next_action == StateResult.TRANSITION and next_state:
                 # Check if a response was provided (it should be!)
-                if final_response and final_response.strip():
+                if has_final_response:
                     # Store the message - this will be used by the state machine
                     updated_context['message'] = final_response
                     print(f"🔧 SYSTEM: Transition requested with message: '{final_response[:50]}...' (OPTIMIZED - will be used)")
@@ -595,46 +613,23 @@ Remember to use the generate_response tool for your final response.
                     if 'message' in updated_context:
                         del updated_context['message']
             # For other actions, store the final response message (only if we got one from tools)
-            elif final_response and final_response.strip():
+            elif has_final_response:
                 updated_context['message'] = final_response
                 # Print both the system message and what will be shown to the user
                 print(f"🔧 SYSTEM: Using tool-generated response")
                 print(f"🤖 {final_response}")
             else:
                 # If no tool provided a response, use the LLM's direct response if available
-                if response.content and response.content.strip():
-                    updated_context['message'] = response.content.strip()
+                if direct_content:
+                    updated_context['message'] = direct_content
                     print(f"🔧 SYSTEM: No tool response - using LLM direct response")
-                    print(f"🤖 {response.content.strip()}")
+                    print(f"🤖 {direct_content}")
                 else:
-                    # If no response at all, try to call generate_response again with a clarification request
-                    try:
-                        # Create a clarification request based on the current state and context
-                        clarification_message = f"I need more information to help you with your {context.get('animal_type', 'animal')} concern. Could you please provide more details?"
-                        
-                        # Call the generate_response tool directly
-                        response_tool = tool_manager.get_tool("generate_response")
-                        if response_tool:
-                            tool_result = response_tool.execute({
-                                'response': clarification_message,
-                                'next_action': 'continue'
-                            })
-                            if tool_result and 'response' in tool_result:
-                                updated_context['message'] = tool_result['response']
-                                print(f"🔧 SYSTEM: Using generate_response tool for clarification")
-                            else:
-                                # Fallback if tool execution fails
-                                updated_context['message'] = clarification_message
-                                print(f"🔧 SYSTEM: Using clarification message as fallback")
-                        else:
-                            # Fallback if tool not found
-                            updated_context['message'] = clarification_message
-                            print(f"🔧 SYSTEM: Using clarification message as fallback (tool not found)")
-                    except Exception as tool_error:
-                        # Ultimate fallback if everything else fails
-                        print(f"🔧 SYSTEM: Error in fallback handling: {str(tool_error)}")
-                        updated_context['message'] = f"I need more information about your request. Could you please provide more details?"
-                        print(f"🔧 SYSTEM: Using simple clarification as ultimate fallback")
+                    # If no response at all, ask for clarification
+                    updated_context['message'] = self._fallback_response(
+                        f"I need more information to help you with your {context.get('animal_type', 'animal')} concern. Could you please provide more details?",
+                        "no response from LLM"
+                    )
             
             # Debug output for final decision
             if next_state:
@@ -647,38 +642,23 @@ Remember to use the generate_response tool for your final response.
         except Exception as e:
             # Fallback to error handling
             print(f"🔧 SYSTEM: ERROR in LLM processing: {str(e)} - using fallback")
+            traceback.print_exc()
             updated_context = context.copy()
             updated_context['llm_error'] = str(e)
             
-            try:
-                # Try to use the generate_response tool directly for error handling
-                error_message = f"I need a bit more information to help you properly. Could you please provide more details about your {context.get('animal_type', 'animal')} concern?"
-                
-                # Call the generate_response tool directly
-                response_tool = tool_manager.get_tool("generate_response")
-                if response_tool:
-                    tool_result = response_tool.execute({
-                        'response': error_message,
-                        'next_action': 'continue'
-                    })
-                    if tool_result and 'response' in tool_result:
-                        updated_context['message'] = tool_result['response']
-                        print(f"🔧 SYSTEM: Using generate_response tool for error recovery")
-                    else:
-                        updated_context['message'] = error_message
-                        print(f"🔧 SYSTEM: Using error message as fallback")
-                else:
-                    updated_context['message'] = error_message
-                    print(f"🔧 SYSTEM: Using error message as fallback (tool not found)")
-            except Exception as tool_error:
-                # Ultimate fallback if everything else fails
-                print(f"🔧 SYSTEM: Error in fallback handling: {str(tool_error)}")
-                updated_context['message'] = f"I need more information to help you properly. Could you please provide more details?"
-                print(f"🔧 SYSTEM: Using simple clarification as ultimate fallback")
-                
+            updated_context['message'] = self._fallback_response(
+                f"I need a bit more information to help you properly. Could you please provide more details about your {context.get('animal_type', 'animal')} concern?",
+                "LLM error"
+            )
+            
             print(f"🔧 SYSTEM: Staying in state '{self.name}' due to error")
             return StateResult.CONTINUE, None, updated_context
     
+    def _fallback_response(self, message: str, reason: str) -> str:
+        """Return a clarification message used when the LLM gave no usable reply"""
+        print(f"🔧 SYSTEM: Using clarification message as fallback ({reason})")
+        return message
+    
     def _handle_tool_call(self, tool_call, context: Dict[str, Any], user_input: str) -> Optional[Dict[str, Any]]:
         """Handle individual tool calls"""
         tool_name = tool_call.name
@@ -707,24 +687,21 @@ Remember to use the generate_response tool for your final response.
         updates = {}
         
         if args.get('context_updates'):
-            # Get the raw updates from the LLM
-            raw_updates = args['context_updates']
-            
-            # Normalize all field names using the ContextField enum
-            normalized_updates = {}
-            for key, value in raw_updates.items():
-                # Convert the key to its canonical form
-                canonical_key = ContextField.normalize_field(key)
-                normalized_updates[canonical_key] = value
-            
-            # Apply any special handling or derived values
-            self._apply_derived_values(normalized_updates)
-            
-            updates = normalized_updates
+            updates = self._normalize_updates(args['context_updates'])
             print(f"🔧 SYSTEM: LLM updated context with {len(updates)} key(s): {list(updates.keys())}")
         
         return {'context_updates': updates}
         
+    def _normalize_updates(self, raw_updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize LLM context update keys and apply derived values"""
+        # Convert every key to its canonical ContextField form
+        normalized_updates = {ContextField.normalize_field(key): value
+                              for key, value in raw_updates.items()}
+        
+        # Apply any special handling or derived values
+        self._apply_derived_values(normalized_updates)
+        return normalized_updates
+    
     def _apply_derived_values(self, updates: Dict[str, Any]) -> None:
         """Apply any special handling or derived values to context updates"""
         # Example: If we have condition='coughing up blood', set animal_condition='critical'
@@ -832,17 +809,7 @@ Remember to use the generate_response tool for your final response.
         next_action = args.get('next_action', 'continue')
         
         # Get any context updates and normalize them
-        raw_updates = args.get('context_updates', {})
-        normalized_updates = {}
-        
-        # Normalize all field names using the ContextField enum
-        for key, value in raw_updates.items():
-            # Convert the key to its canonical form
-            canonical_key = ContextField.normalize_field(key)
-            normalized_updates[canonical_key] = value
-        
-        # Apply any special handling or derived values
-        self._apply_derived_values(normalized_updates)
+        normalized_updates = self._normalize_updates(args.get('context_updates', {}))
         
         # Build the result
         result = {
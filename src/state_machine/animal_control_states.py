@@ -5,6 +5,10 @@ import re
 from .animal_control_state import AnimalControlState, StateResult
 from .context_fields import ContextField
 
+# Phrases that end the call or restart it from the final summary
+END_CALL_PHRASES = ('bye', 'goodbye', 'thanks', 'thank you', 'that\'s all', 'done')
+NEW_REQUEST_PHRASES = ('new', 'another', 'different', 'start over')
+
 class LLMGreetingAndDetermineServiceState(AnimalControlState):
     """Combined LLM-enhanced greeting and service determination state"""
     
@@ -930,15 +934,15 @@ CRITICAL: This is the final state, so make sure your summary is comprehensive an
     
     def process_input(self, user_input: str, context: Dict[str, Any]) -> Tuple[StateResult, Optional[str], Dict[str, Any]]:
         """Process user input in the final summary state"""
-        result, next_state, updated_context = self.process_input_with_llm(user_input, context)
-        
-        # Check for conversation ending keywords
+        # Check for conversation ending keywords first - the LLM reply would be discarded
         user_input_lower = user_input.lower().strip()
-        if any(term in user_input_lower for term in ['bye', 'goodbye', 'thanks', 'thank you', 'that\'s all', 'done']):
-            return StateResult.COMPLETE, None, updated_context
+        if any(term in user_input_lower for term in END_CALL_PHRASES):
+            return StateResult.COMPLETE, None, context.copy()
+        
+        result, next_state, updated_context = self.process_input_with_llm(user_input, context)
         
         # Check for new service request
-        if any(term in user_input_lower for term in ['new', 'another', 'different', 'start over']):
+        if any(term in user_input_lower for term in NEW_REQUEST_PHRASES):
             return StateResult.TRANSITION, "GREETING", updated_context
         
         return result, next_state, updated_context
@@ -77,17 +77,9 @@ class ContextField(Enum):
     @classmethod
     def normalize_field(cls, field: str) -> str:
         """Convert any field name to its canonical form"""
-        # If it's already a canonical field, return it
-        if field in [e.value for e in cls]:
-            return field
-            
-        # Check aliases
-        for primary, aliases in cls.get_aliases().items():
-            if field in aliases:
-                return primary
-                
-        # If no match found, return the original
-        return field
+        # Single lookup; canonical fields map to themselves, aliases to their
+        # primary field, and unknown fields fall back to the original
+        return _CANONICAL_FIELDS.get(field, field)
     
     @classmethod
     def normalize_context(cls, context: Dict[str, Any]) -> Dict[str, Any]:
@@ -105,3 +97,18 @@ class ContextField(Enum):
             normalized[cls.ANIMAL_CONDITION.value] = 'critical'
             
         return normalized
+
+
+def _build_canonical_fields() -> Dict[str, str]:
+    """Map every known field and alias to its canonical name"""
+    canonical = {}
+    for primary, aliases in ContextField.get_aliases().items():
+        for alias in aliases:
+            canonical.setdefault(alias, primary)
+    # Canonical fields take precedence over aliases with the same name
+    canonical.update({field.value: field.value for field in ContextField})
+    return canonical
+
+
+# Built once at import
+_CANONICAL_FIELDS: Dict[str, str] = _build_canonical_fields()
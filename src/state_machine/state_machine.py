@@ -1,7 +1,9 @@
 from typing import Dict, Any, Optional
 import asyncio
+import threading
+import traceback
 from queue import Queue
-from datetime import datetime
+from time import perf_counter
 from .animal_control_state import AnimalControlState, StateResult
 from .state_enum import StateEnum
 
@@ -14,7 +16,7 @@ class StateMachine:
         self.context: Dict[str, Any] = {}
         self.conversation_history: list = []
         self.is_complete = False
-        self._processing = False  # Track if currently processing
+        self._processing_lock = threading.Lock()  # Held while a turn is being processed
         self._input_queue = Queue()  # Queue for handling concurrent inputs
         self.call_logger = call_logger  # Optional call logger for analytics
         self._transition_start_time = None  # Track processing time
@@ -58,15 +60,13 @@ class StateMachine:
             return "This conversation has ended. Please start a new session."
         
         # Check if already processing - queue the input
-        if self._processing:
+        # Non-blocking acquire makes the check-and-claim atomic across threads
+        if not self._processing_lock.acquire(blocking=False):
             print(f"⚠️ SYSTEM: Already processing - queuing input: '{user_input}'")
             self._input_queue.put(user_input)
             # Return a placeholder - the queued input will be processed after current one
             return ""  # Empty response - the agent should handle this gracefully
         
-        # Mark as processing
-        self._processing = True
-        
         try:
             # Process the current input
             response = self._process_input_internal(user_input)
@@ -80,12 +80,12 @@ class StateMachine:
             return response
         finally:
             # Always release the lock
-            self._processing = False
+            self._processing_lock.release()
     
     def _process_input_internal(self, user_input: str) -> str:
         """Internal method that does the actual processing"""
-        # Track processing time
-        self._transition_start_time = datetime.now()
+        # Track processing time (monotonic, cheaper than datetime.now())
+        self._transition_start_time = perf_counter()
         
         # Log user input
         self._log_interaction("USER", user_input)
@@ -121,7 +121,7 @@ class StateMachine:
             
             # Log to call logger if available
             if self.call_logger:
-                processing_time = int((datetime.now() - self._transition_start_time).total_seconds() * 1000)
+                processing_time = int((perf_counter() - self._transition_start_time) * 1000)
                 
                 # Extract LLM stats from context
                 llm_response = updated_context.get('last_llm_response', {})
@@ -149,6 +149,8 @@ class StateMachine:
             
         except Exception as e:
             # Handle errors
+            print(f"❌ SYSTEM: Error processing input in state '{self.current_state.name}': {e}")
+            traceback.print_exc()
             result, next_state_name, updated_context = self.current_state.handle_error(e, self.context)
             self.context.update(updated_context)
             
@@ -1,6 +1,21 @@
 import re
 from typing import Optional
 from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+# Precompiled patterns (avoid re's per-call cache lookup on hot validators)
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+PHONE_SEPARATORS_RE = re.compile(r'[\s\-\(\)\.]+')
+NAME_RE = re.compile(r"^[a-zA-Z\s\-']+$")
+NON_DIGIT_RE = re.compile(r'\D')
+
+# Characters stripped by sanitize_input, as a str.translate deletion table
+UNSAFE_CHARS_TABLE = str.maketrans('', '', '<>"\'&')
+
+# Appointment scheduling window
+MAX_APPOINTMENT_ADVANCE = relativedelta(months=6)
+BUSINESS_HOURS_START = 6   # 6 AM
+BUSINESS_HOURS_END = 22    # 10 PM
 
 class InputValidator:
     """Utility class for validating user inputs"""
@@ -8,23 +23,23 @@ class InputValidator:
     @staticmethod
     def validate_email(email: str) -> bool:
         """Validate email format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email.strip()))
+        return bool(EMAIL_RE.match(email.strip()))
     
     @staticmethod
     def validate_phone(phone: str) -> bool:
         """Validate phone number format"""
         # Remove common separators and spaces
-        cleaned = re.sub(r'[\s\-\(\)\.]+', '', phone)
-        
-        # Check for valid US phone number patterns
-        patterns = [
-            r'^\d{10}$',  # 1234567890
-            r'^1\d{10}$',  # 11234567890
-            r'^\+1\d{10}$'  # +11234567890
-        ]
+        cleaned = PHONE_SEPARATORS_RE.sub('', phone)
         
-        return any(re.match(pattern, cleaned) for pattern in patterns)
+        # Check for valid US phone number patterns, rejecting on length first
+        length = len(cleaned)
+        if length == 10:  # 1234567890
+            return cleaned.isdecimal()
+        if length == 11:  # 11234567890
+            return cleaned[0] == '1' and cleaned.isdecimal()
+        if length == 12:  # +11234567890
+            return cleaned.startswith('+1') and cleaned[2:].isdecimal()
+        return False
     
     @staticmethod
     def validate_name(name: str) -> bool:
@@ -34,14 +49,13 @@ class InputValidator:
             return False
         
         # Allow letters, spaces, hyphens, and apostrophes
-        pattern = r"^[a-zA-Z\s\-']+$"
-        return bool(re.match(pattern, name))
+        return bool(NAME_RE.match(name))
     
     @staticmethod
     def normalize_phone(phone: str) -> str:
         """Normalize phone number to standard format"""
         # Remove all non-digit characters
-        digits = re.sub(r'\D', '', phone)
+        digits = NON_DIGIT_RE.sub('', phone)
         
         # Remove leading 1 if present (US country code)
         if len(digits) == 11 and digits.startswith('1'):
@@ -68,13 +82,12 @@ class InputValidator:
             return False, "Appointment must be scheduled for a future date and time."
         
         # Check if too far in advance (e.g., more than 6 months)
-        max_advance = now.replace(year=now.year + (now.month + 6) // 12, 
-                                 month=(now.month + 6) % 12 or 12)
-        if dt > max_advance:
+        # relativedelta clamps the day to the target month (e.g. Aug 31 -> Feb 28)
+        if dt > now + MAX_APPOINTMENT_ADVANCE:
             return False, "Appointments can only be scheduled up to 6 months in advance."
         
         # Check if during reasonable hours (6 AM to 10 PM)
-        if dt.hour < 6 or dt.hour >= 22:
+        if dt.hour < BUSINESS_HOURS_START or dt.hour >= BUSINESS_HOURS_END:
             return False, "Appointments can only be scheduled between 6:00 AM and 10:00 PM."
         
         # Check if on weekend (optional business rule)
@@ -90,9 +103,9 @@ class InputValidator:
             return ""
         
         # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
+        text = ' '.join(text.split())
         
         # Remove potentially harmful characters (basic sanitization)
-        text = re.sub(r'[<>\"\'&]', '', text)
+        text = text.translate(UNSAFE_CHARS_TABLE)
         
         return text[:500]  # Limit length to prevent abuse